@@ -27,6 +27,7 @@ def main():
     parser.add_argument('-id', '--input_dir', type=str, help='path of the input directory containing all the input files or directories', required=True)
 
     parser_download.add_argument('-m', '--max_workers', type=str, help='number of processes to be spawned', default=2)
+    parser_download.add_argument('-rd', '--rib_dir', type=str, help='path of the directory with one sub-directory per collector containing local MRT RIB dumps, used instead of the CAIDA routeviews snapshots', required=False, default=None)
 
     parser_merge.add_argument('-o', '--output_filename', type=str, help='suffix of the .json output filename, as stored in the final directory, after merging ris and routeviews snapshots for the selected time window', required=True)
     parser_merge.add_argument('-t', '--threshold', type=functools.partial(range_type, min=0, max=100), help='consistency threshold in % (0-100) to be applied under merging process', required=False, default=50, metavar="[0-100]")
@@ -47,9 +48,14 @@ def main():
         ripe_ris_.ris_prefixes_scheduler(args.start_date, args.end_date, args.input_dir, max_workers=int(args.max_workers))
         
         routeviews_ = routeviews.routeviews()
-        # Step 4: Download and parse RV snapshots to extract ASNs
-        # Skips existing snapshots BUT it needs the raw .gz files
-        routeviews_.routeviews_scheduler(args.start_date, args.end_date, args.input_dir, int(args.max_workers))    
+        if args.rib_dir:
+            # Step 4: Parse local MRT RIB dumps of all collectors to extract ASNs
+            # Skips existing snapshots
+            routeviews_.routeviews_mrt_scheduler(args.start_date, args.end_date, args.input_dir, args.rib_dir, int(args.max_workers))
+        else:
+            # Step 4: Download and parse RV snapshots to extract ASNs
+            # Skips existing snapshots BUT it needs the raw .gz files
+            routeviews_.routeviews_scheduler(args.start_date, args.end_date, args.input_dir, int(args.max_workers))    
 
     if args.subparser_name == 'merge':
         merger_ = merger.merger(args.threshold)
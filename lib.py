@@ -5,6 +5,10 @@ import netaddr
 import ipaddress
 import socket
 import pytricia
+import hashlib
+import os
+import threading
+import shutil
 
 
 def import_json(filename):
@@ -26,6 +30,42 @@ def export_json(data, filename):
         exit()
 
 
+def hash_prefixes(prefixes):
+    # Content hash of a prefix set, independent of the order the prefixes were announced
+    return hashlib.sha1('\n'.join(sorted(set(prefixes))).encode()).hexdigest()
+
+
+def export_prefix_object(prefixes, objects_dir):
+    # Stores a prefix set once under its content hash and returns the hash.
+    # Unchanged sets across days (or shared by MOAS ASNs) are written only the first time
+    digest = hash_prefixes(prefixes)
+    filename = objects_dir+digest+'.json'
+    if not os.path.exists(filename):
+        # Concurrent workers may store the same set, so write to a private file and rename it
+        tmp_filename = '%s.%d.%d.tmp' % (filename, os.getpid(), threading.get_ident())
+        export_json(sorted(set(prefixes)), tmp_filename)
+        os.replace(tmp_filename, filename)
+    return digest
+
+
+def export_snapshot_index(asn_to_digest, snapshots_dir, date):
+    # Writes the day index into a private directory and renames it to the day directory,
+    # so that a day directory only exists once its index is complete
+    if os.path.isdir(snapshots_dir+date):
+        print('Skipping %s snapshot, its directory already exists' % date)
+        return
+
+    tmp_dir = '%s%s.%d.tmp/' % (snapshots_dir, date, os.getpid())
+    os.makedirs(tmp_dir, exist_ok=True)
+    export_json(asn_to_digest, tmp_dir+'index.json')
+    try:
+        os.rename(tmp_dir, snapshots_dir+date)
+    except OSError as e:
+        # Another worker published the same day in the meantime
+        print('Skipping %s snapshot, its directory already exists -' % date, e)
+        shutil.rmtree(tmp_dir)
+
+
 def export_pyt_to_json(pyt, filename):
     data = {}
     try:
@@ -148,6 +148,8 @@ class merger():
 
         number_of_snaps = 0
         merged_snaps = {}
+        # Number of days each (ASN, prefix set hash) pair appears in
+        asn_digest_days = {}
 
         starttime = datetime.datetime.strptime(start_date, "%Y-%m-%d")
         endtime   = datetime.datetime.strptime(end_date, "%Y-%m-%d")
@@ -155,12 +157,31 @@ class merger():
         for time in rrule.rrule(rrule.DAILY, dtstart=starttime, until=endtime):
             date = str(time.date())
             if os.path.isdir(input_dir+dataset+date):
+                index_exists = os.path.exists(input_dir+dataset+date+'/index.json')
+                as_filenames = [filename for filename in sorted(os.listdir(input_dir+dataset+date)) if filename.startswith('AS') and filename.endswith('.json')]
+
+                # An interrupted download must not be counted as a day without announcements
+                if not index_exists and not as_filenames:
+                    print('Skipping incomplete snapshot %s%s without index or AS files' % (dataset,date))
+                    continue
+
                 number_of_snaps+=1
 
                 print('Merging from %s%s' % (dataset,date))
 
+                # Content-addressed snapshot: only count the referenced prefix sets per ASN
+                if index_exists:
+                    asn_to_digest = lib.import_json(input_dir+dataset+date+'/index.json')
+                    for asn in asn_to_digest:
+                        key = (int(asn), asn_to_digest[asn])
+                        if key in asn_digest_days:
+                            asn_digest_days[key]+=1
+                        else:
+                            asn_digest_days[key]=1
+                    continue
+
                  # Calculate prefix frequency announced by a certain ASN
-                for filename in sorted(os.listdir(input_dir+dataset+date)):
+                for filename in as_filenames:
                     asn         = int(filename.lstrip('AS').rstrip('.json'))
                     prefixes    = lib.import_json(input_dir+dataset+date+'/'+filename)
                     for prefix in prefixes:
@@ -169,6 +190,24 @@ class merger():
                         else:
                             merged_snaps[(prefix,asn)]=1.0 
 
+        # Parse each distinct prefix set once and count it for all the days it appears in
+        digest_to_asns = {}
+        for asn,digest in asn_digest_days:
+            if digest in digest_to_asns:
+                digest_to_asns[digest].append(asn)
+            else:
+                digest_to_asns[digest] = [asn]
+
+        for digest in digest_to_asns:
+            prefixes = lib.import_json(input_dir+dataset+'objects/'+digest+'.json')
+            for asn in digest_to_asns[digest]:
+                days = asn_digest_days[(asn,digest)]
+                for prefix in prefixes:
+                    if (prefix,asn) in merged_snaps:
+                        merged_snaps[(prefix,asn)]+=days
+                    else:
+                        merged_snaps[(prefix,asn)]=float(days)
+
         db = {}
         # Keep only ip2as mappings complied with the specified threshold
         for prefix,asn in merged_snaps:
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+import gzip
+import bz2
+import struct
+import socket
+
+# MRT types and subtypes (RFC 6396, RFC 8050)
+TABLE_DUMP_V2 = 13
+PEER_INDEX_TABLE = 1
+RIB_IPV4_UNICAST = 2
+RIB_IPV4_UNICAST_ADDPATH = 8
+
+# BGP path attribute and AS_PATH segment types (RFC 4271, RFC 5065)
+ATTR_FLAG_EXTENDED_LENGTH = 0x10
+ATTR_TYPE_AS_PATH = 2
+AS_SET = 1
+AS_SEQUENCE = 2
+
+MRT_HEADER = struct.Struct('!IHHI')
+
+# Shorter prefixes (e.g. the default route) are leaks rather than real announcements
+MIN_PREFIX_LEN = 8
+
+
+def open_mrt(filename):
+    # Opens a raw or compressed (.gz, .bz2) MRT dump for streaming reads
+    if filename.endswith('.gz'):
+        return gzip.open(filename, 'rb')
+    elif filename.endswith('.bz2'):
+        return bz2.open(filename, 'rb')
+    return open(filename, 'rb')
+
+
+def iter_mrt_records(fp, filename):
+    # Streams (type, subtype, body) of every MRT record without loading the whole dump
+    while True:
+        header = fp.read(MRT_HEADER.size)
+        if not header:
+            break
+        if len(header) < MRT_HEADER.size:
+            print('Truncated MRT header in %s' % filename)
+            break
+        _, mrt_type, mrt_subtype, length = MRT_HEADER.unpack(header)
+        body = fp.read(length)
+        if len(body) < length:
+            print('Truncated MRT record in %s' % filename)
+            break
+        yield mrt_type, mrt_subtype, body
+
+
+def get_peers(body):
+    # Returns the peer IP addresses of a PEER_INDEX_TABLE, in the order RIB entries refer to them
+    peers = []
+    view_name_len = struct.unpack_from('!H', body, 4)[0]
+    offset = 6+view_name_len
+    peer_count = struct.unpack_from('!H', body, offset)[0]
+    offset += 2
+    for _ in range(peer_count):
+        peer_type = body[offset]
+        offset += 5
+        # Bit 0 selects an IPv6 peer address, bit 1 a 4-byte peer ASN
+        # unpack_from raises struct.error on a truncated table instead of returning a short address
+        if peer_type & 0x01:
+            peers.append(socket.inet_ntop(socket.AF_INET6, struct.unpack_from('!16s', body, offset)[0]))
+            offset += 16
+        else:
+            peers.append(socket.inet_ntoa(struct.unpack_from('!4s', body, offset)[0]))
+            offset += 4
+        offset += 4 if peer_type & 0x02 else 2
+    return peers
+
+
+def get_origin_asn(attrs, offset, end):
+    # Returns the origin ASN of the AS_PATH attribute, None for AS sets or empty paths.
+    # TABLE_DUMP_V2 always encodes ASNs with 4 bytes
+    while offset < end:
+        flags, attr_type = attrs[offset], attrs[offset+1]
+        if flags & ATTR_FLAG_EXTENDED_LENGTH:
+            attr_len = struct.unpack_from('!H', attrs, offset+2)[0]
+            offset += 4
+        else:
+            attr_len = attrs[offset+2]
+            offset += 3
+
+        if attr_type == ATTR_TYPE_AS_PATH:
+            origin_asn = None
+            segment, segment_end = offset, offset+attr_len
+            while segment < segment_end:
+                segment_type, segment_count = attrs[segment], attrs[segment+1]
+                segment += 2
+                # Skip confederation segments, they never hold the origin
+                if segment_type == AS_SEQUENCE and segment_count:
+                    origin_asn = struct.unpack_from('!I', attrs, segment+4*(segment_count-1))[0]
+                elif segment_type == AS_SET:
+                    origin_asn = None
+                segment += 4*segment_count
+            return origin_asn
+
+        offset += attr_len
+    return None
+
+
+def iter_prefix_origins(filename):
+    # Extracts (IPv4 prefix, origin ASN, peer) for every RIB entry of a TABLE_DUMP_V2 dump.
+    # The peer is its IP address, or its index when the dump has no PEER_INDEX_TABLE
+    with open_mrt(filename) as fp:
+        peers = []
+        for mrt_type, mrt_subtype, body in iter_mrt_records(fp, filename):
+            if mrt_type != TABLE_DUMP_V2:
+                continue
+            try:
+                if mrt_subtype == PEER_INDEX_TABLE:
+                    peers = get_peers(body)
+                    continue
+                if mrt_subtype not in (RIB_IPV4_UNICAST, RIB_IPV4_UNICAST_ADDPATH):
+                    continue
+
+                prefix_len = body[4]
+                if prefix_len > 32 or prefix_len < MIN_PREFIX_LEN:
+                    continue
+                offset = 5+(prefix_len+7)//8
+                entry_count = struct.unpack_from('!H', body, offset)[0]
+                # Clear any host bits so that the prefix is always a valid network
+                address = int.from_bytes(body[5:offset].ljust(4, b'\0'), 'big') & (0xFFFFFFFF << (32-prefix_len)) & 0xFFFFFFFF
+                prefix = socket.inet_ntoa(address.to_bytes(4, 'big'))+'/'+str(prefix_len)
+                offset += 2
+
+                # Each entry is the route as seen from a certain peer of the collector
+                for _ in range(entry_count):
+                    peer_index = struct.unpack_from('!H', body, offset)[0]
+                    offset += 6
+                    if mrt_subtype == RIB_IPV4_UNICAST_ADDPATH:
+                        offset += 4
+                    attr_len = struct.unpack_from('!H', body, offset)[0]
+                    offset += 2
+                    origin_asn = get_origin_asn(body, offset, offset+attr_len)
+                    offset += attr_len
+                    if origin_asn is not None:
+                        yield prefix, origin_asn, peers[peer_index] if peer_index < len(peers) else peer_index
+            except (IndexError, ValueError, OSError, struct.error):
+                print('Malformed MRT record in %s' % filename)
@@ -73,6 +73,10 @@ class ripe_ris():
         # Create snapshots directory
         if not os.path.isdir(input_dir+'snapshots/'):
             os.mkdir(input_dir+'snapshots/')
+
+        # Create objects directory storing each distinct prefix set once
+        if not os.path.isdir(input_dir+'snapshots/objects/'):
+            os.mkdir(input_dir+'snapshots/objects/')
         
         starttime = datetime.datetime.strptime(start_date, "%Y-%m-%d")
         endtime   = datetime.datetime.strptime(end_date, "%Y-%m-%d")
@@ -113,15 +117,12 @@ class ripe_ris():
             date = str(time.date())
             print('Retrieving RIS prefixes for the ASN snapshot: %s' % date)
             
-            # Create date directory
-            if not os.path.isdir(ris_data_dir+date):
-                os.mkdir(ris_data_dir+date)
             # prepare arguments for parallelized crawl
             list_of_param_dicts = []
             for asn in asns:
                 param_dict = {
                     "asn"             : str(asn),
-                    "ris_data_dir"    : ris_data_dir+date,
+                    "objects_dir"     : ris_data_dir+'objects/',
                     "min_peers_seeing": str(min_peers_seeing),
                     "starttime"       : date,
                     "endtime"         : date
@@ -130,11 +131,17 @@ class ripe_ris():
         
         # for each date the number of max_workers correspond to the number of ASes to concurrently  download their prefixes
         with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-            executor.map(self.export_prefixes, list_of_param_dicts)
+            asn_to_digest = dict(filter(None, executor.map(self.export_prefixes, list_of_param_dicts)))
+
+        # The day index references the stored prefix set of each ASN by its hash
+        if asn_to_digest:
+            lib.export_snapshot_index(asn_to_digest, ris_data_dir, date)
+        else:
+            print('No RIS prefixes retrieved for the ASN snapshot: %s' % date)
         
 
     def export_prefixes(self, params):
-        # Exports the retrieved prefixes for the queried ASN
+        # Exports the retrieved prefixes for the queried ASN and returns (asn, hash of its prefix set)
         prefixes_set = set()
 
         asn              = params['asn']
@@ -176,9 +183,9 @@ class ripe_ris():
                     prefixes_list.remove(prefix)
                 
                 if prefixes_list:
-                    filename = "{}/AS{}.json".format(params["ris_data_dir"], asn)
-                    lib.export_json(prefixes_list, filename)
-        except ConnectTimeout:
-            print('Request has timed out for AS', asn, starttime)
+                    return asn, lib.export_prefix_object(prefixes_list, params["objects_dir"])
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print('Request has failed for AS', asn, starttime, '-', e)
+        return None
 
         
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 
 import lib
+import mrt
 import os
+import re
 import concurrent.futures
 from dateutil import rrule
 import gzip
+import zlib
 from bs4 import BeautifulSoup
 import wget
 import requests
@@ -87,6 +90,10 @@ class routeviews():
         if not os.path.isdir(input_dir+'snapshots/'):
             os.mkdir(input_dir+'snapshots/')
 
+        # Create the objects directory storing each distinct prefix set once
+        if not os.path.isdir(input_dir+'snapshots/objects/'):
+            os.mkdir(input_dir+'snapshots/objects/')
+
         # Parse only RV snapshots for the specified time window
         dates = self.get_dates(start_date, end_date)        
 
@@ -139,9 +146,141 @@ class routeviews():
                                 asn_to_prefixes[asn] = []
                                 asn_to_prefixes[asn].append(prefix)
             
-            if asn_to_prefixes:
-                os.mkdir(input_dir+'snapshots/'+date)
+            self.export_snapshot(input_dir, date, asn_to_prefixes)
+
+
+    def routeviews_mrt_scheduler(self, start_date, end_date, input_dir, rib_dir, max_workers, min_peers_seeing=2):
+        # Builds the routeviews snapshots from local MRT RIB dumps instead of the CAIDA pfx2as files.
+        # rib_dir contains one directory per collector (RouteViews or RIS) with its RIB dumps,
+        # e.g. route-views2/rib.20220201.0000.bz2 or rrc00/bview.20220201.0000.gz
+        # As for RIS, a prefix-to-AS mapping is kept only when seen from at least min_peers_seeing peers
+
+        input_dir+='routeviews/'
+
+        # Create the snapshots directory
+        if not os.path.isdir(input_dir+'snapshots/'):
+            os.mkdir(input_dir+'snapshots/')
+
+        # Create the objects directory storing each distinct prefix set once
+        if not os.path.isdir(input_dir+'snapshots/objects/'):
+            os.mkdir(input_dir+'snapshots/objects/')
+
+        # Parse only RIB dumps for the specified time window
+        dates = self.get_dates(start_date, end_date)
+
+        # Group all the samples of each day per collector
+        date_to_params = {}
+        skipped_dates = set()
+        for collector in sorted(os.listdir(rib_dir)):
+            if not os.path.isdir(os.path.join(rib_dir, collector)):
+                continue
+            for filename in sorted(os.listdir(os.path.join(rib_dir, collector))):
+                rib_match = re.match(r'^(rib|bview)\.([0-9]{8})\.([0-9]{4})', filename)
+                if not rib_match or rib_match.group(2) not in dates:
+                    continue
+                date = str(datetime.datetime.strptime(rib_match.group(2), "%Y%m%d"))[0:10]
+                if os.path.isdir(input_dir+'snapshots/'+date):
+                    if date not in skipped_dates:
+                        print('Skipping %s RV snapshot' % date)
+                        skipped_dates.add(date)
+                    continue
+                if date not in date_to_params:
+                    date_to_params[date] = {}
+                if collector not in date_to_params[date]:
+                    date_to_params[date][collector] = {
+                        "collector" : collector,
+                        "filenames" : []
+                    }
+                date_to_params[date][collector]["filenames"].append(os.path.join(rib_dir, collector, filename))
+
+        # With max_workers=1 parallelization is disabled
+        # Each worker parses the samples of one collector for a certain date
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            future_to_date_collector = {}
+            for date in date_to_params:
+                for collector in date_to_params[date]:
+                    print('Preparing to parse %s RIB dumps of %s' % (date, collector))
+                    date_to_params[date][collector]["min_peers_seeing"] = min_peers_seeing
+                    future_to_date_collector[executor.submit(self.mrt_parser, date_to_params[date][collector])] = (date, collector)
+
+            # Blend all collectors of a date as soon as their RIB dumps have been parsed
+            date_to_pending = {date:len(date_to_params[date]) for date in date_to_params}
+            date_to_asn_prefix_peers = {}
+            for future in concurrent.futures.as_completed(future_to_date_collector):
+                date, collector = future_to_date_collector[future]
+                if date not in date_to_asn_prefix_peers:
+                    date_to_asn_prefix_peers[date] = {}
+                asn_to_prefix_peers = date_to_asn_prefix_peers[date]
+
+                # A failed collector must not lose the other collectors of the date
+                try:
+                    collector_asn_to_prefix_peers = future.result()
+                except Exception as e:
+                    print('Error with %s RIB dumps of %s - %s' % (date, collector, e))
+                    collector_asn_to_prefix_peers = {}
+
+                # The same peer may feed several collectors, so take the union of the peer identities
+                for asn, prefix_peers in collector_asn_to_prefix_peers.items():
+                    if asn not in asn_to_prefix_peers:
+                        asn_to_prefix_peers[asn] = {}
+                    for prefix in prefix_peers:
+                        if prefix in asn_to_prefix_peers[asn]:
+                            peers = asn_to_prefix_peers[asn][prefix]
+                            for peer in prefix_peers[prefix]:
+                                if len(peers) >= min_peers_seeing:
+                                    break
+                                if peer not in peers:
+                                    peers += (peer,)
+                            asn_to_prefix_peers[asn][prefix] = peers
+                        else:
+                            asn_to_prefix_peers[asn][prefix] = prefix_peers[prefix]
+
+                date_to_pending[date]-=1
+                if not date_to_pending[date]:
+                    asn_to_prefix_peers = date_to_asn_prefix_peers.pop(date)
+                    asn_to_prefixes = {}
+                    for asn in asn_to_prefix_peers:
+                        prefixes = [prefix for prefix in asn_to_prefix_peers[asn] if len(asn_to_prefix_peers[asn][prefix]) >= min_peers_seeing]
+                        if prefixes:
+                            asn_to_prefixes[asn] = prefixes
+                    self.export_snapshot(input_dir, date, asn_to_prefixes)
+
+
+    def mrt_parser(self, params):
+        # Parses the RIB dumps of a collector and extracts for each origin AS its announced prefixes
+        # along with the identities of the peers seeing each of them. Only up to min_peers_seeing
+        # peers are kept per mapping, which is all the threshold needs, to bound memory and transfer
+        max_peers = max(params['min_peers_seeing'], 1)
+        prefix_asn_to_peers = {}
+        for filename in params['filenames']:
+            print('Parsing %s' % filename)
+            # Partial downloads are common, keep the records parsed before the error and the other dumps
+            try:
+                for prefix, asn, peer in mrt.iter_prefix_origins(filename):
+                    # Without a PEER_INDEX_TABLE peers are only known by their index within the collector
+                    if not isinstance(peer, str):
+                        peer = '%s:%d' % (params['collector'], peer)
+                    if (prefix,asn) in prefix_asn_to_peers:
+                        peers = prefix_asn_to_peers[(prefix,asn)]
+                        if len(peers) < max_peers and peer not in peers:
+                            prefix_asn_to_peers[(prefix,asn)] = peers + (peer,)
+                    else:
+                        prefix_asn_to_peers[(prefix,asn)] = (peer,)
+            except (EOFError, OSError, zlib.error) as e:
+                print('Error with RIB dump %s - %s' % (filename, e))
+
+        asn_to_prefix_peers = {}
+        for prefix,asn in prefix_asn_to_peers:
+            if str(asn) not in asn_to_prefix_peers:
+                asn_to_prefix_peers[str(asn)] = {}
+            asn_to_prefix_peers[str(asn)][prefix] = prefix_asn_to_peers[(prefix,asn)]
+        return asn_to_prefix_peers
+
 
-                for asn in asn_to_prefixes:
-                    output_filename = input_dir+'snapshots/'+date+'/AS'+asn+'.json'
-                    lib.export_json(asn_to_prefixes[asn],output_filename)
+    def export_snapshot(self, input_dir, date, asn_to_prefixes):
+        # Exports the daily snapshot, unchanged prefix sets are stored once and referenced by hash from the day index
+        if asn_to_prefixes:
+            asn_to_digest = {}
+            for asn in asn_to_prefixes:
+                asn_to_digest[asn] = lib.export_prefix_object(asn_to_prefixes[asn], input_dir+'snapshots/objects/')
+            lib.export_snapshot_index(asn_to_digest, input_dir+'snapshots/', date)
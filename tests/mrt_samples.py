@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+# Builds small TABLE_DUMP_V2 sample dumps (RFC 6396) for the tests
+
+import struct
+import socket
+import gzip
+import bz2
+
+AS_SET = 1
+AS_SEQUENCE = 2
+
+
+def mrt_record(subtype, body):
+    return struct.pack('!IHHI', 0, 13, subtype, len(body)) + body
+
+
+def peer_index_table(peer_ips):
+    # IPv4 peers with 4-byte ASNs
+    body = socket.inet_aton('192.0.2.1') + struct.pack('!H', 0) + struct.pack('!H', len(peer_ips))
+    for peer_ip in peer_ips:
+        body += struct.pack('!B', 0x02) + socket.inet_aton('192.0.2.1') + socket.inet_aton(peer_ip) + struct.pack('!I', 64512)
+    return mrt_record(1, body)
+
+
+def as_path(segments, extended_length=False):
+    # segments: list of (segment type, [ASNs]), preceded by an ORIGIN attribute
+    path = b''.join(struct.pack('!BB', segment_type, len(asns)) + b''.join(struct.pack('!I', asn) for asn in asns) for segment_type, asns in segments)
+    attrs = struct.pack('!BBB', 0x40, 1, 1) + b'\x00'
+    if extended_length:
+        return attrs + struct.pack('!BBH', 0x50, 2, len(path)) + path
+    return attrs + struct.pack('!BBB', 0x40, 2, len(path)) + path
+
+
+def rib_ipv4(prefix, prefix_len, entries, addpath=False):
+    # entries: list of (peer index, path attributes)
+    body = struct.pack('!IB', 0, prefix_len) + socket.inet_aton(prefix)[:(prefix_len+7)//8]
+    body += struct.pack('!H', len(entries))
+    for peer_index, attrs in entries:
+        body += struct.pack('!HI', peer_index, 0)
+        if addpath:
+            body += struct.pack('!I', 1)
+        body += struct.pack('!H', len(attrs)) + attrs
+    return mrt_record(8 if addpath else 2, body)
+
+
+def write_dump(filename, records):
+    data = b''.join(records)
+    if filename.endswith('.gz'):
+        opener = gzip.open
+    elif filename.endswith('.bz2'):
+        opener = bz2.open
+    else:
+        opener = open
+    with opener(filename, 'wb') as fp:
+        fp.write(data)
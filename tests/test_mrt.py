@@ -0,0 +1,192 @@
+import os
+import gzip
+import socket
+import struct
+
+import lib
+import mrt
+import routeviews
+from mrt_samples import AS_SET, AS_SEQUENCE, mrt_record, peer_index_table, as_path, rib_ipv4, write_dump
+
+PEERS = ['198.51.100.1', '198.51.100.2']
+
+
+def test_as_sequence_origin_and_peer(tmp_path):
+    filename = str(tmp_path / 'rib.20220201.0000')
+    write_dump(filename, [
+        peer_index_table(PEERS),
+        rib_ipv4('1.0.0.0', 24, [(0, as_path([(AS_SEQUENCE, [10, 20, 100])])), (1, as_path([(AS_SEQUENCE, [30, 200])], extended_length=True))]),
+    ])
+    assert list(mrt.iter_prefix_origins(filename)) == [('1.0.0.0/24', 100, PEERS[0]), ('1.0.0.0/24', 200, PEERS[1])]
+
+
+def test_as_set_is_skipped(tmp_path):
+    filename = str(tmp_path / 'rib.20220201.0000')
+    write_dump(filename, [
+        peer_index_table(PEERS),
+        rib_ipv4('10.0.0.0', 8, [(0, as_path([(AS_SEQUENCE, [10]), (AS_SET, [5, 6])])), (1, as_path([(AS_SEQUENCE, [10, 11])]))]),
+    ])
+    assert list(mrt.iter_prefix_origins(filename)) == [('10.0.0.0/8', 11, PEERS[1])]
+
+
+def test_addpath_entry(tmp_path):
+    filename = str(tmp_path / 'rib.20220201.0000')
+    write_dump(filename, [
+        peer_index_table(PEERS),
+        rib_ipv4('2.0.0.0', 16, [(1, as_path([(AS_SEQUENCE, [1, 100])]))], addpath=True),
+    ])
+    assert list(mrt.iter_prefix_origins(filename)) == [('2.0.0.0/16', 100, PEERS[1])]
+
+
+def test_host_bits_are_masked_and_short_prefixes_dropped(tmp_path):
+    filename = str(tmp_path / 'rib.20220201.0000')
+    write_dump(filename, [
+        peer_index_table(PEERS),
+        rib_ipv4('0.0.0.0', 0, [(0, as_path([(AS_SEQUENCE, [9])]))]),
+        rib_ipv4('4.0.0.0', 6, [(0, as_path([(AS_SEQUENCE, [9])]))]),
+        rib_ipv4('10.1.2.3', 12, [(0, as_path([(AS_SEQUENCE, [100])]))]),
+    ])
+    assert list(mrt.iter_prefix_origins(filename)) == [('10.0.0.0/12', 100, PEERS[0])]
+
+
+def test_truncated_record(tmp_path, capsys):
+    filename = str(tmp_path / 'rib.20220201.0000')
+    record = rib_ipv4('3.0.0.0', 8, [(0, as_path([(AS_SEQUENCE, [300])]))])
+    write_dump(filename, [peer_index_table(PEERS), rib_ipv4('1.0.0.0', 24, [(0, as_path([(AS_SEQUENCE, [100])]))]), record[:len(record)//2]])
+    assert list(mrt.iter_prefix_origins(filename)) == [('1.0.0.0/24', 100, PEERS[0])]
+    assert 'Truncated MRT record in %s' % filename in capsys.readouterr().out
+
+
+def test_gz_input(tmp_path):
+    filename = str(tmp_path / 'bview.20220201.0000.gz')
+    write_dump(filename, [peer_index_table(PEERS), rib_ipv4('1.0.0.0', 24, [(0, as_path([(AS_SEQUENCE, [100])]))])])
+    assert list(mrt.iter_prefix_origins(filename)) == [('1.0.0.0/24', 100, PEERS[0])]
+
+
+def test_malformed_peer_index_table(tmp_path, capsys):
+    # IPv6 peer whose address is cut short, the RIB entries fall back to the peer index
+    filename = str(tmp_path / 'rib.20220201.0000')
+    malformed_table = mrt_record(1, socket.inet_aton('192.0.2.1') + struct.pack('!HH', 0, 1) + struct.pack('!B', 0x03) + socket.inet_aton('192.0.2.1') + b'\x20\x01\x0d\xb8')
+    write_dump(filename, [malformed_table, rib_ipv4('1.0.0.0', 24, [(0, as_path([(AS_SEQUENCE, [100])]))])])
+    assert list(mrt.iter_prefix_origins(filename)) == [('1.0.0.0/24', 100, 0)]
+    assert 'Malformed MRT record in %s' % filename in capsys.readouterr().out
+
+    asn_to_prefix_peers = routeviews.routeviews().mrt_parser({'collector': 'rrc00', 'filenames': [filename], 'min_peers_seeing': 2})
+    assert asn_to_prefix_peers == {'100': {'1.0.0.0/24': ('rrc00:0',)}}
+
+
+def test_mrt_parser_caps_peers(tmp_path):
+    filename = str(tmp_path / 'rib.20220201.0000')
+    peers = ['198.51.100.%d' % i for i in range(1, 11)]
+    write_dump(filename, [peer_index_table(peers), rib_ipv4('1.0.0.0', 24, [(i, as_path([(AS_SEQUENCE, [100])])) for i in range(10)])])
+    asn_to_prefix_peers = routeviews.routeviews().mrt_parser({'collector': 'rrc00', 'filenames': [filename], 'min_peers_seeing': 2})
+    assert asn_to_prefix_peers == {'100': {'1.0.0.0/24': (peers[0], peers[1])}}
+
+
+def test_corrupt_gz_keeps_other_dumps(tmp_path, capsys):
+    # A half-written download must only lose the records it is missing
+    corrupt_filename = str(tmp_path / 'bview.20220201.0000.gz')
+    filename = str(tmp_path / 'bview.20220201.0800.gz')
+    records = [peer_index_table(PEERS)] + [rib_ipv4('%d.0.0.0' % i, 8, [(0, as_path([(AS_SEQUENCE, [100])]))]) for i in range(1, 200)]
+    with open(corrupt_filename, 'wb') as fp:
+        fp.write(gzip.compress(b''.join(records))[:200])
+    write_dump(filename, [peer_index_table(PEERS), rib_ipv4('203.0.0.0', 8, [(1, as_path([(AS_SEQUENCE, [200])]))])])
+
+    asn_to_prefix_peers = routeviews.routeviews().mrt_parser({'collector': 'rrc00', 'filenames': [corrupt_filename, filename], 'min_peers_seeing': 2})
+    assert asn_to_prefix_peers['200'] == {'203.0.0.0/8': (PEERS[1],)}
+    assert 'Error with RIB dump %s' % corrupt_filename in capsys.readouterr().out
+
+
+def test_routeviews_mrt_scheduler(tmp_path):
+    rib_dir = tmp_path / 'ribs'
+    (rib_dir / 'route-views2').mkdir(parents=True)
+    (rib_dir / 'rrc00').mkdir()
+    input_dir = str(tmp_path) + '/'
+    os.mkdir(input_dir + 'routeviews/')
+
+    # 1.0.0.0/24 is seen by one peer on each collector, 9.0.0.0/8 leaks from a single peer
+    write_dump(str(rib_dir / 'route-views2' / 'rib.20220201.0000.bz2'), [
+        peer_index_table(PEERS),
+        rib_ipv4('1.0.0.0', 24, [(0, as_path([(AS_SEQUENCE, [10, 100])]))]),
+        rib_ipv4('9.0.0.0', 8, [(1, as_path([(AS_SEQUENCE, [10, 666])]))]),
+    ])
+    write_dump(str(rib_dir / 'rrc00' / 'bview.20220201.0000.gz'), [
+        peer_index_table(PEERS),
+        rib_ipv4('1.0.0.0', 24, [(1, as_path([(AS_SEQUENCE, [20, 100])]))]),
+        rib_ipv4('2.0.0.0', 16, [(0, as_path([(AS_SEQUENCE, [200])])), (1, as_path([(AS_SEQUENCE, [30, 200])]))]),
+    ])
+    # The same peer in two samples of a day counts once
+    write_dump(str(rib_dir / 'rrc00' / 'bview.20220202.0000.gz'), [
+        peer_index_table(PEERS),
+        rib_ipv4('2.0.0.0', 16, [(0, as_path([(AS_SEQUENCE, [200])])), (1, as_path([(AS_SEQUENCE, [200])]))]),
+        rib_ipv4('1.0.0.0', 24, [(0, as_path([(AS_SEQUENCE, [100])]))]),
+    ])
+    write_dump(str(rib_dir / 'rrc00' / 'bview.20220202.0800.gz'), [
+        peer_index_table(PEERS),
+        rib_ipv4('1.0.0.0', 24, [(0, as_path([(AS_SEQUENCE, [100])]))]),
+    ])
+
+    routeviews.routeviews().routeviews_mrt_scheduler('2022-02-01', '2022-02-02', input_dir, str(rib_dir), 2)
+
+    snapshots_dir = input_dir + 'routeviews/snapshots/'
+    day_1 = lib.import_json(snapshots_dir + '2022-02-01/index.json')
+    day_2 = lib.import_json(snapshots_dir + '2022-02-02/index.json')
+    assert sorted(day_1) == ['100', '200']
+    assert list(day_2) == ['200']
+    # Unchanged prefix sets are stored once
+    assert day_1['200'] == day_2['200']
+    assert sorted(os.listdir(snapshots_dir + 'objects/')) == sorted({day_1['100'] + '.json', day_1['200'] + '.json'})
+    assert lib.import_json(snapshots_dir + 'objects/' + day_1['100'] + '.json') == ['1.0.0.0/24']
+    assert lib.import_json(snapshots_dir + 'objects/' + day_1['200'] + '.json') == ['2.0.0.0/16']
+
+
+def test_routeviews_mrt_scheduler_counts_distinct_peers(tmp_path):
+    # The same peer feeding two collectors is a single peer
+    rib_dir = tmp_path / 'ribs'
+    (rib_dir / 'rrc00').mkdir(parents=True)
+    (rib_dir / 'rrc01').mkdir()
+    input_dir = str(tmp_path) + '/'
+    os.mkdir(input_dir + 'routeviews/')
+
+    write_dump(str(rib_dir / 'rrc00' / 'bview.20220201.0000.gz'), [
+        peer_index_table(PEERS),
+        rib_ipv4('1.0.0.0', 24, [(0, as_path([(AS_SEQUENCE, [100])]))]),
+        rib_ipv4('2.0.0.0', 16, [(0, as_path([(AS_SEQUENCE, [200])]))]),
+    ])
+    write_dump(str(rib_dir / 'rrc01' / 'bview.20220201.0000.gz'), [
+        peer_index_table([PEERS[1], PEERS[0]]),
+        rib_ipv4('1.0.0.0', 24, [(1, as_path([(AS_SEQUENCE, [100])]))]),
+        rib_ipv4('2.0.0.0', 16, [(0, as_path([(AS_SEQUENCE, [200])]))]),
+    ])
+
+    routeviews.routeviews().routeviews_mrt_scheduler('2022-02-01', '2022-02-01', input_dir, str(rib_dir), 2)
+
+    snapshots_dir = input_dir + 'routeviews/snapshots/'
+    assert list(lib.import_json(snapshots_dir + '2022-02-01/index.json')) == ['200']
+
+
+class failing_routeviews(routeviews.routeviews):
+    def mrt_parser(self, params):
+        if params['collector'] == 'rrc01':
+            raise ValueError('bad dump')
+        return routeviews.routeviews.mrt_parser(self, params)
+
+
+def test_routeviews_mrt_scheduler_failed_collector(tmp_path, capsys):
+    rib_dir = tmp_path / 'ribs'
+    (rib_dir / 'rrc00').mkdir(parents=True)
+    (rib_dir / 'rrc01').mkdir()
+    input_dir = str(tmp_path) + '/'
+    os.mkdir(input_dir + 'routeviews/')
+
+    write_dump(str(rib_dir / 'rrc00' / 'bview.20220201.0000.gz'), [
+        peer_index_table(PEERS),
+        rib_ipv4('1.0.0.0', 24, [(0, as_path([(AS_SEQUENCE, [100])])), (1, as_path([(AS_SEQUENCE, [100])]))]),
+    ])
+    write_dump(str(rib_dir / 'rrc01' / 'bview.20220201.0000.gz'), [peer_index_table(PEERS)])
+
+    failing_routeviews().routeviews_mrt_scheduler('2022-02-01', '2022-02-01', input_dir, str(rib_dir), 2)
+
+    snapshots_dir = input_dir + 'routeviews/snapshots/'
+    assert list(lib.import_json(snapshots_dir + '2022-02-01/index.json')) == ['100']
+    assert 'Error with 2022-02-01 RIB dumps of rrc01 - bad dump' in capsys.readouterr().out
@@ -0,0 +1,112 @@
+import os
+
+import requests
+
+import lib
+import merger
+import ripe_ris
+
+
+def test_export_prefix_object_ignores_order_and_duplicates(tmp_path):
+    objects_dir = str(tmp_path) + '/'
+    digest = lib.export_prefix_object(['2.0.0.0/16', '1.0.0.0/24'], objects_dir)
+    assert lib.export_prefix_object(['1.0.0.0/24', '2.0.0.0/16', '1.0.0.0/24'], objects_dir) == digest
+    assert lib.export_prefix_object(['1.0.0.0/24'], objects_dir) != digest
+    assert sorted(os.listdir(objects_dir)) == sorted([digest + '.json', lib.hash_prefixes(['1.0.0.0/24']) + '.json'])
+    assert lib.import_json(objects_dir + digest + '.json') == ['1.0.0.0/24', '2.0.0.0/16']
+
+
+def test_export_snapshot_index(tmp_path):
+    snapshots_dir = str(tmp_path) + '/'
+    lib.export_snapshot_index({'100': 'abc'}, snapshots_dir, '2022-02-01')
+    assert os.listdir(snapshots_dir) == ['2022-02-01']
+    assert lib.import_json(snapshots_dir + '2022-02-01/index.json') == {'100': 'abc'}
+
+
+def test_export_snapshot_index_keeps_existing_day(tmp_path, capsys):
+    # e.g. a day directory left by an older run or a second pfx2as file of the same day
+    snapshots_dir = str(tmp_path) + '/'
+    os.mkdir(snapshots_dir + '2022-02-01')
+    lib.export_snapshot_index({'100': 'abc'}, snapshots_dir, '2022-02-01')
+    assert os.listdir(snapshots_dir) == ['2022-02-01']
+    assert os.listdir(snapshots_dir + '2022-02-01') == []
+    assert 'Skipping 2022-02-01 snapshot' in capsys.readouterr().out
+
+
+def write_index_day(snapshots_dir, date, asn_to_prefixes):
+    asn_to_digest = {asn: lib.export_prefix_object(asn_to_prefixes[asn], snapshots_dir + 'objects/') for asn in asn_to_prefixes}
+    lib.export_snapshot_index(asn_to_digest, snapshots_dir, date)
+
+
+def test_merge_snapshots(tmp_path, monkeypatch):
+    input_dir = str(tmp_path) + '/'
+    snapshots_dir = input_dir + 'ris/snapshots/'
+    os.makedirs(snapshots_dir + 'objects/')
+
+    write_index_day(snapshots_dir, '2022-02-01', {'1': ['1.0.0.0/24', '1.1.0.0/16'], '2': ['2.0.0.0/16']})
+    write_index_day(snapshots_dir, '2022-02-02', {'1': ['1.1.0.0/16', '1.0.0.0/24'], '2': ['3.0.0.0/8']})
+    # Snapshot stored before the content-addressed layout
+    os.mkdir(snapshots_dir + '2022-02-03')
+    lib.export_json(['1.0.0.0/24', '1.1.0.0/16'], snapshots_dir + '2022-02-03/AS1.json')
+    lib.export_json(['3.0.0.0/8'], snapshots_dir + '2022-02-03/AS2.json')
+    # Interrupted download, it must not count as a day
+    os.mkdir(snapshots_dir + '2022-02-04')
+
+    object_imports = []
+    import_json = lib.import_json
+    def counting_import_json(filename):
+        if '/objects/' in filename:
+            object_imports.append(filename)
+        return import_json(filename)
+    monkeypatch.setattr(lib, 'import_json', counting_import_json)
+
+    merger.merger(60).merge_snapshots('2022-02-01', '2022-02-04', input_dir, 'ris/snapshots/', 't')
+    db = lib.import_json(input_dir + 'merged/ris_2022-02-01_2022-02-04_t.json')
+    assert db == {'1.0.0.0/24': [1], '1.1.0.0/16': [1], '3.0.0.0/8': [2]}
+    # Each distinct prefix set is parsed once regardless of the days it appears in
+    assert len(object_imports) == len(set(object_imports)) == 3
+
+    merger.merger(100).merge_snapshots('2022-02-01', '2022-02-04', input_dir, 'ris/snapshots/', 't')
+    db = lib.import_json(input_dir + 'merged/ris_2022-02-01_2022-02-04_t.json')
+    assert db == {'1.0.0.0/24': [1], '1.1.0.0/16': [1]}
+
+
+class response():
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        if self.data is None:
+            raise ValueError('Expecting value')
+        return self.data
+
+
+def export_prefixes_params(objects_dir, asn='100'):
+    return {'asn': asn, 'min_peers_seeing': '2', 'starttime': '2022-02-01', 'endtime': '2022-02-01', 'objects_dir': objects_dir}
+
+
+def test_export_prefixes(tmp_path, monkeypatch):
+    objects_dir = str(tmp_path) + '/'
+    data = {'data': {'resource': '100', 'prefixes': [{'prefix': '1.0.0.0/24'}, {'prefix': '2001:db8::/32'}, {'prefix': '2.0.0.0/16'}]}}
+    monkeypatch.setattr(requests, 'get', lambda url, timeout: response(data))
+
+    asn, digest = ripe_ris.ripe_ris.export_prefixes(None, export_prefixes_params(objects_dir))
+    assert asn == '100'
+    assert lib.import_json(objects_dir + digest + '.json') == ['1.0.0.0/24', '2.0.0.0/16']
+
+
+def test_export_prefixes_failures(tmp_path, monkeypatch):
+    objects_dir = str(tmp_path) + '/'
+
+    monkeypatch.setattr(requests, 'get', lambda url, timeout: response(None))
+    assert ripe_ris.ripe_ris.export_prefixes(None, export_prefixes_params(objects_dir)) is None
+
+    def timeout(url, timeout):
+        raise requests.exceptions.ConnectTimeout('timed out')
+    monkeypatch.setattr(requests, 'get', timeout)
+    assert ripe_ris.ripe_ris.export_prefixes(None, export_prefixes_params(objects_dir)) is None
+
+    # No announced prefixes
+    monkeypatch.setattr(requests, 'get', lambda url, timeout: response({'data': {'resource': '100', 'prefixes': []}}))
+    assert ripe_ris.ripe_ris.export_prefixes(None, export_prefixes_params(objects_dir)) is None
+    assert os.listdir(objects_dir) == []